@@ -9,6 +9,7 @@ import tensorflow as tf
 
 from model.input_fn import input_fn
 from model.model_fn import model_fn
+from model.resnet import default_data_format
 from model.evaluation import evaluate
 from model.utils import Params
 from model.utils import set_logger
@@ -43,24 +44,20 @@ if __name__ == '__main__':
 
     # Get the filenames and labels from the train and dev sets
     test_filenames_labels = pd.read_csv(os.path.join(data_dir, 'test_Amazon_Rainforest.csv'))
-    test_filenames = [os.path.join(test_data_dir, f) + ".jpg" for f in test_filenames_labels.image_name.tolist()]
+    test_filenames = (test_data_dir + os.sep + test_filenames_labels['image_name'] + ".jpg").tolist()
 
     # Build list with unique labels
-    label_list = []
+    label_set = set()
     for tag_str in test_filenames_labels.tags.values:
-        labels = tag_str.split(' ')
-        for label in labels:
-            if label not in label_list:
-                label_list.append(label)
+        label_set.update(tag_str.split(' '))
+    # Sort the labels so that the label columns have the same order as in train.py
+    label_list = sorted(label_set)
     assert(len(label_list) == 17) # Assert that test has the same labels as the train/dev
 
-    # # Add onehot features for every label
-    for label in label_list:
-        test_filenames_labels[label] = test_filenames_labels['tags'].apply(lambda x: 1 if label in x.split(' ') else 0)
-
-    # Convert the labels to a matrix
-    # Labels will be  0 or 1 for each category
-    test_labels = test_filenames_labels.drop(["image_name", 'tags'], axis=1).as_matrix()
+    # Convert the labels to a matrix of onehot features for every label
+    # Labels will be  0 or 1 for each category, with the columns ordered as label_list
+    test_labels = (test_filenames_labels['tags'].str.get_dummies(sep=' ')
+                   .reindex(columns=label_list, fill_value=0).to_numpy())
 
     # specify the size of the evaluation set
     params.eval_size = len(test_filenames)
@@ -68,6 +65,10 @@ if __name__ == '__main__':
     # create the iterator over the dataset
     test_inputs = input_fn(False, test_filenames, test_labels, params)
 
+    # Pick the resnet data format for the available devices if it isn't set
+    if params.dict.get('data_format') is None:
+        params.data_format = default_data_format()
+
     # Define the model
     logging.info("Creating the model...")
     model_spec = model_fn('eval', test_inputs, params, reuse=False)
@@ -3,19 +3,33 @@
 import tensorflow as tf
 import numpy as np
 
+from model.utils import hvd
 
-def _parse_function(filename, label, size):
+
+def _decode_function(filename, label):
     """Obtain the image from the filename (for both training and validation).
 
     The following operations are applied:
         - Decode the image from jpeg format
-        - Convert to float and to range [0, 1]
+
+    The decoded image is kept as uint8 so that the training cache files (`cache_path` in
+    `input_fn`) stay four times smaller than with float32 images.
     """
     image_string = tf.read_file(filename)
 
     # Don't use tf.image.decode_image, or the output shape will be undefined
     image_decoded = tf.image.decode_jpeg(image_string, channels=3)
 
+    return image_decoded, label
+
+
+def _parse_function(image_decoded, label, size):
+    """Prepare the decoded image (for both training and validation).
+
+    The following operations are applied:
+        - Convert to float and to range [0, 1]
+        - Resize to `size` x `size`
+    """
     # This will convert to float values in [0, 1]
     image = tf.image.convert_image_dtype(image_decoded, tf.float32)
 
@@ -67,7 +81,7 @@ def train_preprocess3(image, label, use_transpose = True):
     return image, label
 
 
-def input_fn(is_training, filenames, labels, params):
+def input_fn(is_training, filenames, labels, params, cache_path=None):
     """Input function for the Amazon Rainforest  dataset.
 
     Args:
@@ -76,32 +90,52 @@ def input_fn(is_training, filenames, labels, params):
         filenames: (list) filenames of the images
         labels: (list) corresponding list of labels
         params: (Params) contains hyperparameters of the model (ex: `params.num_epochs`)
+        cache_path: (string) optional file prefix where the decoded training images are cached
     """
     num_samples = len(filenames)
     assert len(filenames) == len(labels), "Filenames and labels should have same length"
 
     # Create a Dataset serving batches of images and labels
     # We don't repeat for multiple epochs because we always train and evaluate for one epoch
+    # The parallelism of the maps and the prefetching are tuned at runtime by tf.data,
+    # unless `params.num_parallel_calls` or `params.prefetch_buffer_size` are set
+    autotune = tf.data.experimental.AUTOTUNE
+    num_parallel_calls = params.dict.get('num_parallel_calls') or autotune
+    prefetch_buffer_size = params.dict.get('prefetch_buffer_size') or autotune
     parse_fn = lambda f, l: _parse_function(f, l, params.image_size)
     train_fn = lambda f, l: train_preprocess(f, l, params.use_random_flip)
     train_fn2 = lambda f, l: train_preprocess2(f, l, params.use_random_flip)
     train_fn3 = lambda f, l: train_preprocess3(f, l, params.use_transpose)
 
     if is_training:
-        dataset = (tf.data.Dataset.from_tensor_slices((tf.constant(filenames), tf.constant(labels)))
+        dataset = tf.data.Dataset.from_tensor_slices((tf.constant(filenames), tf.constant(labels)))
+        if params.dict.get('use_horovod'):
+            # Each worker only reads its own shard of the training set
+            # All the shards have the same size, so every worker reads its shard to the end
+            shard_size = num_samples // hvd.size()
+            dataset = dataset.take(shard_size * hvd.size()).shard(hvd.size(), hvd.rank())
+        dataset = dataset.map(_decode_function, num_parallel_calls=num_parallel_calls)
+        if cache_path is not None:
+            # The iterator is re-initialized every epoch, which throws away an in-memory cache,
+            # so the decoded images are cached in files. The shuffle buffer below holds the whole
+            # dataset, so the first epoch reads the cache to its end and completes it; the
+            # following epochs read from the cache files and skip the jpeg decoding
+            dataset = dataset.cache(cache_path)
+        dataset = (dataset
             .shuffle(num_samples)  # whole dataset into the buffer ensures good shuffling
-            .map(parse_fn, num_parallel_calls=params.num_parallel_calls)
-            .map(train_fn, num_parallel_calls=params.num_parallel_calls)
-            .map(train_fn2, num_parallel_calls=params.num_parallel_calls)
-            .map(train_fn3, num_parallel_calls=params.num_parallel_calls)
+            .map(parse_fn, num_parallel_calls=num_parallel_calls)
+            .map(train_fn, num_parallel_calls=num_parallel_calls)
+            .map(train_fn2, num_parallel_calls=num_parallel_calls)
+            .map(train_fn3, num_parallel_calls=num_parallel_calls)
             .batch(params.batch_size)
-            .prefetch(1)  # make sure you always have one batch ready to serve
+            .prefetch(prefetch_buffer_size)  # make sure you always have batches ready to serve
         )
     else:
         dataset = (tf.data.Dataset.from_tensor_slices((tf.constant(filenames), tf.constant(labels)))
-            .map(parse_fn)
+            .map(_decode_function, num_parallel_calls=num_parallel_calls)
+            .map(parse_fn, num_parallel_calls=num_parallel_calls)
             .batch(params.batch_size)
-            .prefetch(1)  # make sure you always have one batch ready to serve
+            .prefetch(prefetch_buffer_size)  # make sure you always have batches ready to serve
         )
 
     # Create reinitializable iterator from dataset
@@ -3,6 +3,7 @@
 
 import tensorflow as tf
 import model.resnet as resnet
+from model.utils import hvd
 
 
 def build_model(is_training, inputs, params):
@@ -26,12 +27,14 @@ def build_model(is_training, inputs, params):
     # For each block, we do: 3x3 conv -> batch norm -> relu -> 2x2 maxpool
     num_channels = params.num_channels
     bn_momentum = params.bn_momentum
+    # The same regularizer is shared by all the layers
+    weights_regularizer = tf.contrib.layers.l2_regularizer(params.weight_decay)
     channels = [num_channels, num_channels * 2, num_channels * 4, num_channels * 8]
     for i, c in enumerate(channels):
         with tf.variable_scope('block_{}'.format(i+1)):
             # out = tf.layers.conv2d(out, c, 3, padding='same')
             out = tf.contrib.layers.conv2d(out, c, 3, padding='same',
-                                           weights_regularizer=tf.contrib.layers.l2_regularizer(params.weight_decay))
+                                           weights_regularizer=weights_regularizer)
             if params.use_batch_norm:
                 out = tf.layers.batch_normalization(out, momentum=bn_momentum, training=is_training)
             out = tf.nn.relu(out)
@@ -42,14 +45,14 @@ def build_model(is_training, inputs, params):
     with tf.variable_scope('fc_1'):
         # out = tf.layers.dense(out, num_channels * 8)
         out = tf.contrib.layers.fully_connected(out, num_channels * 8,
-                                                weights_regularizer=tf.contrib.layers.l2_regularizer(params.weight_decay))
+                                                weights_regularizer=weights_regularizer)
         if params.use_batch_norm:
             out = tf.layers.batch_normalization(out, momentum=bn_momentum, training=is_training)
         out = tf.nn.relu(out)
     with tf.variable_scope('fc_2'):
         # logits = tf.layers.dense(out, params.num_labels)
         logits = tf.contrib.layers.fully_connected(out, params.num_labels,
-                                                   weights_regularizer=tf.contrib.layers.l2_regularizer(params.weight_decay))
+                                                   weights_regularizer=weights_regularizer)
     return logits
 
 
@@ -110,12 +113,20 @@ def model_fn(mode, inputs, params, reuse=False):
 
         # Uncomment for specified learning rate
         optimizer = tf.train.AdamOptimizer(params.learning_rate)
+        if params.dict.get('use_horovod'):
+            # Average the gradients over all the workers with an all-reduce
+            optimizer = hvd.DistributedOptimizer(optimizer)
+        # use_fp16 only applies to the resnet (see build_resnet_), build_model always runs in float32
+        if params.dict.get('use_fp16'):
+            # Scale the loss dynamically so that small float16 gradients don't underflow
+            loss_scale_manager = tf.contrib.mixed_precision.ExponentialUpdateLossScaleManager(
+                init_loss_scale=2**15, incr_every_n_steps=2000)
+            optimizer = tf.contrib.mixed_precision.LossScaleOptimizer(optimizer, loss_scale_manager)
         global_step = tf.train.get_or_create_global_step()
-        if params.use_batch_norm:
-            # Add a dependency to update the moving mean and variance for batch normalization
-            with tf.control_dependencies(tf.get_collection(tf.GraphKeys.UPDATE_OPS)):
-                train_op = optimizer.minimize(loss, global_step=global_step)
-        else:
+        # Add a dependency to update the moving mean and variance for batch normalization
+        # This doesn't depend on params.use_batch_norm since the resnet always uses batch norm
+        update_ops = tf.get_collection(tf.GraphKeys.UPDATE_OPS)
+        with tf.control_dependencies(update_ops):
             train_op = optimizer.minimize(loss, global_step=global_step)
 
     # -----------------------------------------------------------
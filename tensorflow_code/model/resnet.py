@@ -42,73 +42,146 @@ from __future__ import print_function
 
 
 import tensorflow as tf
+from tensorflow.python.client import device_lib
 
 
 _BATCH_NORM_DECAY = 0.997
 _BATCH_NORM_EPSILON = 1e-5
 DEFAULT_VERSION = 2
+DEFAULT_DTYPE = tf.float32
+CASTABLE_TYPES = (tf.float16,)
+ALLOWED_TYPES = (DEFAULT_DTYPE,) + CASTABLE_TYPES
 
 
 ################################################################################
 # Convenience functions for building the ResNet model.
 ################################################################################
+def default_data_format(session_config=None):
+    """Returns the data format to use on the devices visible to a session.
+
+    'channels_first' is used when a GPU is visible and 'channels_last'
+    otherwise (including CUDA builds whose GPUs are hidden, e.g. with
+    CUDA_VISIBLE_DEVICES="").
+
+    Args:
+      session_config: The tf.ConfigProto the session will be created with, so
+        that only the devices it makes visible get initialized.
+
+    Returns:
+      Either 'channels_first' or 'channels_last'.
+    """
+    devices = device_lib.list_local_devices(session_config)
+    if any(device.device_type == 'GPU' for device in devices):
+        return 'channels_first'
+    return 'channels_last'
+
+
 def batch_norm(inputs, training, data_format):
     """Performs a batch normalization using a standard set of parameters."""
-    # We set fused=True for a significant performance boost. See
+    # We call the fused kernel directly for a significant performance boost. See
     # https://www.tensorflow.org/performance/performance_guide#common_fused_ops
-    return tf.layers.batch_normalization(
-        inputs=inputs, axis=1 if data_format == 'channels_first' else 3,
-        momentum=_BATCH_NORM_DECAY, epsilon=_BATCH_NORM_EPSILON, center=True,
-        scale=True, training=training, fused=True)
+    # The variables keep the names used by `tf.layers.batch_normalization` so
+    # that existing checkpoints can still be restored.
+    # For float16 inputs the fused kernel accumulates the statistics in float32,
+    # and gamma/beta/moving statistics below are always float32 variables.
+    axis = 1 if data_format == 'channels_first' else 3
+    params_shape = inputs.get_shape()[axis:axis + 1]
+    fused_data_format = 'NCHW' if data_format == 'channels_first' else 'NHWC'
+
+    with tf.variable_scope(None, default_name='batch_normalization'):
+        gamma = tf.get_variable('gamma', params_shape,
+                                initializer=tf.ones_initializer())
+        beta = tf.get_variable('beta', params_shape,
+                               initializer=tf.zeros_initializer())
+        moving_mean = tf.get_variable('moving_mean', params_shape,
+                                      initializer=tf.zeros_initializer(),
+                                      trainable=False)
+        moving_variance = tf.get_variable('moving_variance', params_shape,
+                                          initializer=tf.ones_initializer(),
+                                          trainable=False)
+
+        if training:
+            outputs, mean, variance = tf.nn.fused_batch_norm(
+                inputs, gamma, beta, epsilon=_BATCH_NORM_EPSILON,
+                data_format=fused_data_format, is_training=True)
+            # The moving statistics are updated through UPDATE_OPS, which the
+            # train_op depends on (see model_fn).
+            update_mean = tf.assign_sub(
+                moving_mean, (moving_mean - mean) * (1 - _BATCH_NORM_DECAY))
+            update_variance = tf.assign_sub(
+                moving_variance, (moving_variance - variance) * (1 - _BATCH_NORM_DECAY))
+            tf.add_to_collection(tf.GraphKeys.UPDATE_OPS, update_mean)
+            tf.add_to_collection(tf.GraphKeys.UPDATE_OPS, update_variance)
+        else:
+            outputs, _, _ = tf.nn.fused_batch_norm(
+                inputs, gamma, beta, mean=moving_mean, variance=moving_variance,
+                epsilon=_BATCH_NORM_EPSILON, data_format=fused_data_format,
+                is_training=False)
 
+    return outputs
 
-def fixed_padding(inputs, kernel_size, data_format):
-    """Pads the input along the spatial dimensions independently of input size.
 
-    Args:
-      inputs: A tensor of size [batch, channels, height_in, width_in] or
-        [batch, height_in, width_in, channels] depending on data_format.
-      kernel_size: The kernel to be used in the conv2d or max_pool2d operation.
-                   Should be a positive integer.
-      data_format: The input format ('channels_last' or 'channels_first').
+def batch_norm_relu(inputs, training, data_format):
+    """Performs a batch normalization followed by a ReLU.
 
-    Returns:
-      A tensor with the same format as the input with the data either intact
-      (if kernel_size == 1) or padded (if kernel_size > 1).
+    This only groups the two ops, the graph is the same as calling them inline.
+    Any fusion of the ReLU with the batch normalization is done by XLA, which is
+    enabled for the whole graph by the global_jit_level set in train.py.
+    """
+    return tf.nn.relu(batch_norm(inputs, training, data_format))
+
+
+def _fixed_paddings(kernel_size, data_format):
+    """Returns the [beginning, end] paddings of every dimension for `kernel_size`.
+
+    The paddings only depend on `kernel_size`, not on the dimensions of the
+    inputs, and are only applied along the spatial dimensions.
     """
     pad_total = kernel_size - 1
     pad_beg = pad_total // 2
     pad_end = pad_total - pad_beg
 
     if data_format == 'channels_first':
-        padded_inputs = tf.pad(inputs, [[0, 0], [0, 0],
-                                        [pad_beg, pad_end], [pad_beg, pad_end]])
-    else:
-        padded_inputs = tf.pad(inputs, [[0, 0], [pad_beg, pad_end],
-                                        [pad_beg, pad_end], [0, 0]])
-    return padded_inputs
+        return [[0, 0], [0, 0], [pad_beg, pad_end], [pad_beg, pad_end]]
+    return [[0, 0], [pad_beg, pad_end], [pad_beg, pad_end], [0, 0]]
 
 
 def conv2d_fixed_padding(inputs, filters, kernel_size, strides, data_format):
     """Strided 2-D convolution with explicit padding."""
     # The padding is consistent and is based only on `kernel_size`, not on the
     # dimensions of `inputs` (as opposed to using `tf.layers.conv2d` alone).
-
+    # For strided convolutions the padding is passed explicitly to the
+    # convolution instead of materializing a padded copy with `tf.pad`.
     if strides > 1:
-        inputs = fixed_padding(inputs, kernel_size, data_format)
-    print(inputs, filters, kernel_size, strides, data_format)
-    return tf.layers.conv2d(
-        inputs=inputs, filters=filters, kernel_size=kernel_size, strides=strides,
-        padding=('SAME' if strides == 1 else 'VALID'), use_bias=False,
-        kernel_initializer=tf.variance_scaling_initializer(),
-        data_format=data_format)
+        padding = _fixed_paddings(kernel_size, data_format)
+    else:
+        padding = 'SAME'
+
+    if data_format == 'channels_first':
+        in_filters = inputs.get_shape()[1].value
+        conv_strides = [1, 1, strides, strides]
+        conv_data_format = 'NCHW'
+    else:
+        in_filters = inputs.get_shape()[3].value
+        conv_strides = [1, strides, strides, 1]
+        conv_data_format = 'NHWC'
+
+    # No bias is needed since every convolution is followed by batch norm.
+    # The scope and variable names match the ones of `tf.layers.conv2d`.
+    with tf.variable_scope(None, default_name='conv2d'):
+        kernel = tf.get_variable(
+            'kernel', [kernel_size, kernel_size, in_filters, filters],
+            dtype=inputs.dtype, initializer=tf.variance_scaling_initializer())
+        return tf.nn.conv2d(
+            inputs, kernel, strides=conv_strides, padding=padding,
+            data_format=conv_data_format)
 
 
 ################################################################################
 # ResNet block definitions.
 ################################################################################
-def _building_block_v1(inputs, filters, training, projection_shortcut, strides,
-                       data_format):
+def _building_block_v1(inputs, filters, filters_out, training,
+                       projection_shortcut, strides, data_format):
     """
     Convolution then batch normalization then ReLU as described by:
       Deep Residual Learning for Image Recognition
@@ -119,6 +192,8 @@ def _building_block_v1(inputs, filters, training, projection_shortcut, strides,
       inputs: A tensor of size [batch, channels, height_in, width_in] or
         [batch, height_in, width_in, channels] depending on data_format.
       filters: The number of filters for the convolutions.
+      filters_out: The number of filters of the block output (equal to
+        `filters` for building blocks).
       training: A Boolean for whether the model is in training or inference
         mode. Needed for batch normalization.
       projection_shortcut: The function to use for projection shortcuts
@@ -140,11 +215,10 @@ def _building_block_v1(inputs, filters, training, projection_shortcut, strides,
     inputs = conv2d_fixed_padding(
         inputs=inputs, filters=filters, kernel_size=3, strides=strides,
         data_format=data_format)
-    inputs = batch_norm(inputs, training, data_format)
-    inputs = tf.nn.relu(inputs)
+    inputs = batch_norm_relu(inputs, training, data_format)
 
     inputs = conv2d_fixed_padding(
-        inputs=inputs, filters=filters, kernel_size=3, strides=1,
+        inputs=inputs, filters=filters_out, kernel_size=3, strides=1,
         data_format=data_format)
     inputs = batch_norm(inputs, training, data_format)
     inputs += shortcut
@@ -153,8 +227,8 @@ def _building_block_v1(inputs, filters, training, projection_shortcut, strides,
     return inputs
 
 
-def _building_block_v2(inputs, filters, training, projection_shortcut, strides,
-                       data_format):
+def _building_block_v2(inputs, filters, filters_out, training,
+                       projection_shortcut, strides, data_format):
     """
     Batch normalization then ReLu then convolution as described by:
       Identity Mappings in Deep Residual Networks
@@ -165,6 +239,8 @@ def _building_block_v2(inputs, filters, training, projection_shortcut, strides,
       inputs: A tensor of size [batch, channels, height_in, width_in] or
         [batch, height_in, width_in, channels] depending on data_format.
       filters: The number of filters for the convolutions.
+      filters_out: The number of filters of the block output (equal to
+        `filters` for building blocks).
       training: A Boolean for whether the model is in training or inference
         mode. Needed for batch normalization.
       projection_shortcut: The function to use for projection shortcuts
@@ -177,8 +253,7 @@ def _building_block_v2(inputs, filters, training, projection_shortcut, strides,
       The output tensor of the block.
     """
     shortcut = inputs
-    inputs = batch_norm(inputs, training, data_format)
-    inputs = tf.nn.relu(inputs)
+    inputs = batch_norm_relu(inputs, training, data_format)
 
     # The projection shortcut should come after the first batch norm and ReLU
     # since it performs a 1x1 convolution.
@@ -189,17 +264,16 @@ def _building_block_v2(inputs, filters, training, projection_shortcut, strides,
         inputs=inputs, filters=filters, kernel_size=3, strides=strides,
         data_format=data_format)
 
-    inputs = batch_norm(inputs, training, data_format)
-    inputs = tf.nn.relu(inputs)
+    inputs = batch_norm_relu(inputs, training, data_format)
     inputs = conv2d_fixed_padding(
-        inputs=inputs, filters=filters, kernel_size=3, strides=1,
+        inputs=inputs, filters=filters_out, kernel_size=3, strides=1,
         data_format=data_format)
 
     return inputs + shortcut
 
 
-def _bottleneck_block_v1(inputs, filters, training, projection_shortcut,
-                         strides, data_format):
+def _bottleneck_block_v1(inputs, filters, filters_out, training,
+                         projection_shortcut, strides, data_format):
     """
     Similar to _building_block_v1(), except using the "bottleneck" blocks
     described in:
@@ -218,17 +292,15 @@ def _bottleneck_block_v1(inputs, filters, training, projection_shortcut,
     inputs = conv2d_fixed_padding(
         inputs=inputs, filters=filters, kernel_size=1, strides=1,
         data_format=data_format)
-    inputs = batch_norm(inputs, training, data_format)
-    inputs = tf.nn.relu(inputs)
+    inputs = batch_norm_relu(inputs, training, data_format)
 
     inputs = conv2d_fixed_padding(
         inputs=inputs, filters=filters, kernel_size=3, strides=strides,
         data_format=data_format)
-    inputs = batch_norm(inputs, training, data_format)
-    inputs = tf.nn.relu(inputs)
+    inputs = batch_norm_relu(inputs, training, data_format)
 
     inputs = conv2d_fixed_padding(
-        inputs=inputs, filters=4 * filters, kernel_size=1, strides=1,
+        inputs=inputs, filters=filters_out, kernel_size=1, strides=1,
         data_format=data_format)
     inputs = batch_norm(inputs, training, data_format)
     inputs += shortcut
@@ -237,8 +309,8 @@ def _bottleneck_block_v1(inputs, filters, training, projection_shortcut,
     return inputs
 
 
-def _bottleneck_block_v2(inputs, filters, training, projection_shortcut,
-                         strides, data_format):
+def _bottleneck_block_v2(inputs, filters, filters_out, training,
+                         projection_shortcut, strides, data_format):
     """
     Similar to _building_block_v2(), except using the "bottleneck" blocks
     described in:
@@ -254,8 +326,7 @@ def _bottleneck_block_v2(inputs, filters, training, projection_shortcut,
         by Kaiming He, Xiangyu Zhang, Shaoqing Ren, and Jian Sun, Jul 2016.
     """
     shortcut = inputs
-    inputs = batch_norm(inputs, training, data_format)
-    inputs = tf.nn.relu(inputs)
+    inputs = batch_norm_relu(inputs, training, data_format)
 
     # The projection shortcut should come after the first batch norm and ReLU
     # since it performs a 1x1 convolution.
@@ -266,23 +337,21 @@ def _bottleneck_block_v2(inputs, filters, training, projection_shortcut,
         inputs=inputs, filters=filters, kernel_size=1, strides=1,
         data_format=data_format)
 
-    inputs = batch_norm(inputs, training, data_format)
-    inputs = tf.nn.relu(inputs)
+    inputs = batch_norm_relu(inputs, training, data_format)
     inputs = conv2d_fixed_padding(
         inputs=inputs, filters=filters, kernel_size=3, strides=strides,
         data_format=data_format)
 
-    inputs = batch_norm(inputs, training, data_format)
-    inputs = tf.nn.relu(inputs)
+    inputs = batch_norm_relu(inputs, training, data_format)
     inputs = conv2d_fixed_padding(
-        inputs=inputs, filters=4 * filters, kernel_size=1, strides=1,
+        inputs=inputs, filters=filters_out, kernel_size=1, strides=1,
         data_format=data_format)
 
     return inputs + shortcut
 
 
 def block_layer(inputs, filters, bottleneck, block_fn, blocks, strides,
-                training, name, data_format):
+                training, data_format):
     """Creates one layer of blocks for the ResNet model.
 
     Args:
@@ -297,7 +366,6 @@ def block_layer(inputs, filters, bottleneck, block_fn, blocks, strides,
         greater than 1, this layer will ultimately downsample the input.
       training: Either True or False, whether we are currently training the
         model. Needed for batch norm.
-      name: A string name for the tensor output of the block layer.
       data_format: The input format ('channels_last' or 'channels_first').
 
     Returns:
@@ -305,6 +373,7 @@ def block_layer(inputs, filters, bottleneck, block_fn, blocks, strides,
     """
 
     # Bottleneck blocks end with 4x the number of filters as they start with
+    # This is computed once here and passed to every block of the layer
     filters_out = filters * 4 if bottleneck else filters
 
     def projection_shortcut(inputs):
@@ -313,13 +382,14 @@ def block_layer(inputs, filters, bottleneck, block_fn, blocks, strides,
             data_format=data_format)
 
     # Only the first block per block_layer uses projection_shortcut and strides
-    inputs = block_fn(inputs, filters, training, projection_shortcut, strides,
-                      data_format)
+    inputs = block_fn(inputs, filters, filters_out, training, projection_shortcut,
+                      strides, data_format)
 
     for _ in range(1, blocks):
-        inputs = block_fn(inputs, filters, training, None, 1, data_format)
+        inputs = block_fn(inputs, filters, filters_out, training, None, 1,
+                          data_format)
 
-    return tf.identity(inputs, name)
+    return inputs
 
 
 class Model(object):
@@ -330,7 +400,8 @@ class Model(object):
                  kernel_size,
                  conv_stride, first_pool_size, first_pool_stride,
                  second_pool_size, second_pool_stride, block_sizes, block_strides,
-                 final_size, version=DEFAULT_VERSION, data_format=None):
+                 final_size, version=DEFAULT_VERSION, data_format=None,
+                 dtype=DEFAULT_DTYPE):
         """Creates a model for classifying an image.
 
         Args:
@@ -357,13 +428,27 @@ class Model(object):
           version: Integer representing which version of the ResNet network to use.
             See README for details. Valid values: [1, 2]
           data_format: Input format ('channels_last', 'channels_first', or None).
-            If set to None, the format is dependent on whether a GPU is available.
+            If set to None, 'channels_last' is used. No devices are probed
+            while building the graph, callers pick the format for the devices
+            of their session with `default_data_format`.
+            Use 'channels_first' (NCHW) on GPU, which is what the cuDNN
+            convolution kernels are laid out for, and 'channels_last' (NHWC) on
+            CPU, which is what the MKL/Eigen kernels expect. TensorFlow
+            convolutions don't support a CNHW layout, so it is not an option.
+          dtype: The TensorFlow dtype to use for calculations. If not specified
+            tf.float32 is used. With tf.float16 the variables are still stored
+            in float32 and cast to float16 when read.
+
+        Raises:
+          ValueError: if invalid version, data_format or dtype is selected.
         """
         self.resnet_size = resnet_size
 
         if not data_format:
-            data_format = (
-                'channels_first' if tf.test.is_built_with_cuda() else 'channels_last')
+            data_format = 'channels_last'
+        if data_format not in ('channels_first', 'channels_last'):
+            raise ValueError(
+                "data_format should be 'channels_first' or 'channels_last'.")
 
         self.resnet_version = version
         if version not in (1, 2):
@@ -395,6 +480,52 @@ class Model(object):
         self.block_strides = block_strides
         self.final_size = final_size
 
+        if dtype not in ALLOWED_TYPES:
+            raise ValueError('dtype must be one of: {}'.format(ALLOWED_TYPES))
+        self.dtype = dtype
+
+    def _custom_dtype_getter(self, getter, name, shape=None, dtype=DEFAULT_DTYPE,
+                             *args, **kwargs):
+        """Creates variables in fp32, then casts to fp16 if necessary.
+
+        This function is a custom getter. A custom getter is a function with the
+        same signature as tf.get_variable, except it has an additional getter
+        parameter. Custom getters can be passed as the `custom_getter` parameter of
+        tf.variable_scope. Then, tf.get_variable will call the custom getter,
+        instead of directly getting a variable itself.
+
+        Keeping the master copy of the variables in float32 avoids losing small
+        gradient updates to the reduced precision of float16.
+
+        Args:
+          getter: The underlying variable getter, that has the same signature as
+            tf.get_variable and returns a variable.
+          name: The name of the variable to get.
+          shape: The shape of the variable to get.
+          dtype: The dtype of the variable to get.
+          *args: Additional arguments to pass unmodified to getter.
+          **kwargs: Additional keyword arguments to pass unmodified to getter.
+
+        Returns:
+          A variable which is cast to fp16 if necessary.
+        """
+        if dtype in CASTABLE_TYPES:
+            var = getter(name, shape, tf.float32, *args, **kwargs)
+            return tf.cast(var, dtype=dtype, name=name + '_cast')
+        else:
+            return getter(name, shape, dtype, *args, **kwargs)
+
+    def _model_variable_scope(self):
+        """Returns the current variable scope with the dtype custom getter.
+
+        Re-entering the current scope keeps the variable names unchanged.
+
+        Returns:
+          A variable scope for the model.
+        """
+        return tf.variable_scope(tf.get_variable_scope(),
+                                 custom_getter=self._custom_dtype_getter)
+
     def __call__(self, inputs, training):
         """Add operations to classify a batch of input images.
 
@@ -404,48 +535,52 @@ class Model(object):
             training the classifier.
 
         Returns:
-          A logits Tensor with shape [<batch_size>, self.num_classes].
+          A float32 logits Tensor with shape [<batch_size>, self.num_classes].
         """
 
-        if self.data_format == 'channels_first':
-            # Convert the inputs from channels_last (NHWC) to channels_first (NCHW).
-            # This provides a large performance boost on GPU. See
-            # https://www.tensorflow.org/performance/performance_guide#data_formats
-            inputs = tf.transpose(inputs, [0, 3, 1, 2])
-
-        inputs = conv2d_fixed_padding(
-            inputs=inputs, filters=self.num_filters, kernel_size=self.kernel_size,
-            strides=self.conv_stride, data_format=self.data_format)
-        inputs = tf.identity(inputs, 'initial_conv')
-
-        if self.first_pool_size:
-            inputs = tf.layers.max_pooling2d(
-                inputs=inputs, pool_size=self.first_pool_size,
-                strides=self.first_pool_stride, padding='SAME',
+        with self._model_variable_scope():
+            inputs = tf.cast(inputs, self.dtype)
+
+            if self.data_format == 'channels_first':
+                # Convert the inputs from channels_last (NHWC) to channels_first (NCHW).
+                # This provides a large performance boost on GPU. See
+                # https://www.tensorflow.org/performance/performance_guide#data_formats
+                inputs = tf.transpose(inputs, [0, 3, 1, 2])
+
+            inputs = conv2d_fixed_padding(
+                inputs=inputs, filters=self.num_filters, kernel_size=self.kernel_size,
+                strides=self.conv_stride, data_format=self.data_format)
+            inputs = tf.identity(inputs, 'initial_conv')
+
+            if self.first_pool_size:
+                inputs = tf.layers.max_pooling2d(
+                    inputs=inputs, pool_size=self.first_pool_size,
+                    strides=self.first_pool_stride, padding='SAME',
+                    data_format=self.data_format)
+                inputs = tf.identity(inputs, 'initial_max_pool')
+
+            for i, num_blocks in enumerate(self.block_sizes):
+                num_filters = self.num_filters * (2**i)
+                inputs = block_layer(
+                    inputs=inputs, filters=num_filters, bottleneck=self.bottleneck,
+                    block_fn=self.block_fn, blocks=num_blocks,
+                    strides=self.block_strides[i], training=training,
+                    data_format=self.data_format)
+
+            inputs = batch_norm_relu(inputs, training, self.data_format)
+            inputs = tf.layers.average_pooling2d(
+                inputs=inputs, pool_size=self.second_pool_size,
+                strides=self.second_pool_stride, padding='VALID',
                 data_format=self.data_format)
-            inputs = tf.identity(inputs, 'initial_max_pool')
-
-        for i, num_blocks in enumerate(self.block_sizes):
-            num_filters = self.num_filters * (2**i)
-            inputs = block_layer(
-                inputs=inputs, filters=num_filters, bottleneck=self.bottleneck,
-                block_fn=self.block_fn, blocks=num_blocks,
-                strides=self.block_strides[i], training=training,
-                name='block_layer{}'.format(i + 1), data_format=self.data_format)
-
-        inputs = batch_norm(inputs, training, self.data_format)
-        inputs = tf.nn.relu(inputs)
-        inputs = tf.layers.average_pooling2d(
-            inputs=inputs, pool_size=self.second_pool_size,
-            strides=self.second_pool_stride, padding='VALID',
-            data_format=self.data_format)
-        inputs = tf.identity(inputs, 'final_avg_pool')
-
-        # inputs = tf.reshape(inputs, [-1, self.final_size])
-        inputs = tf.contrib.layers.flatten(inputs)
-        inputs = tf.layers.dense(inputs=inputs, units=self.num_classes)
-        inputs = tf.identity(inputs, 'final_dense')
-        return inputs
+            inputs = tf.identity(inputs, 'final_avg_pool')
+
+            # inputs = tf.reshape(inputs, [-1, self.final_size])
+            inputs = tf.contrib.layers.flatten(inputs)
+            # The final dense layer and the logits are kept in float32
+            inputs = tf.cast(inputs, tf.float32)
+            inputs = tf.layers.dense(inputs=inputs, units=self.num_classes)
+            inputs = tf.identity(inputs, 'final_dense')
+            return inputs
 
 
 def build_resnet_(is_training, inputs, params):
@@ -453,7 +588,8 @@ def build_resnet_(is_training, inputs, params):
                    params.kernel_size,
                    params.conv_stride, params.first_pool_size, params.first_pool_stride,
                    params.second_pool_size, params.second_pool_stride, params.block_sizes, params.block_strides,
-                   params.final_size, version=DEFAULT_VERSION, data_format='channels_last')
+                   params.final_size, version=DEFAULT_VERSION, data_format=params.dict.get('data_format'),
+                   dtype=tf.float16 if params.dict.get('use_fp16') else DEFAULT_DTYPE)
     images = inputs['images']
     assert images.get_shape().as_list() == [None, params.image_size, params.image_size, 3]
     out = images
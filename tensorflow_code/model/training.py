@@ -8,6 +8,7 @@ import tensorflow as tf
 
 from model.utils import save_dict_to_json
 from model.evaluation import evaluate_sess
+from model.utils import hvd
 
 
 def train_sess(sess, model_spec, num_steps, writer, params):
@@ -17,7 +18,7 @@ def train_sess(sess, model_spec, num_steps, writer, params):
         sess: (tf.Session) current session
         model_spec: (dict) contains the graph operations or nodes needed for training
         num_steps: (int) train for this number of batches
-        writer: (tf.summary.FileWriter) writer for summaries
+        writer: (tf.summary.FileWriter) writer for summaries. Is None if we don't log anything
         params: (Params) hyperparameters
     """
     # Get relevant graph operations or nodes needed for training
@@ -38,7 +39,7 @@ def train_sess(sess, model_spec, num_steps, writer, params):
     t = trange(num_steps)
     for i in t:
         # Evaluate summaries for tensorboard only once in a while
-        if i % params.save_summary_steps == 0:
+        if writer is not None and i % params.save_summary_steps == 0:
             # Perform a mini-batch update
             _, _, loss_val, summ, global_step_val = sess.run([train_op, update_metrics, loss,
                                                               summary_op, global_step])
@@ -62,7 +63,8 @@ def train_sess(sess, model_spec, num_steps, writer, params):
     logging.info('- F2 Score:' + "{:05.3f}".format(f2_score))
 
 
-def train_and_evaluate(train_model_spec, eval_model_spec, model_dir, params, restore_from=None):
+def train_and_evaluate(train_model_spec, eval_model_spec, model_dir, params, restore_from=None,
+                       config=None):
     """Train the model and evaluate every epoch.
 
     Args:
@@ -72,13 +74,21 @@ def train_and_evaluate(train_model_spec, eval_model_spec, model_dir, params, res
         params: (Params) contains hyperparameters of the model.
                 Must define: num_epochs, train_size, batch_size, eval_size, save_summary_steps
         restore_from: (string) directory or file containing weights to restore the graph
+        config: (tf.ConfigProto) optional session configuration (ex: XLA JIT settings)
     """
     # Initialize tf.Saver instances to save weights during training
     last_saver = tf.train.Saver() # will keep last 5 epochs
     best_saver = tf.train.Saver(max_to_keep=1)  # only keep 1 best checkpoint (best on eval)
     begin_at_epoch = 0
 
-    with tf.Session() as sess:
+    # With horovod, every worker starts from the weights of worker 0, and only worker 0
+    # evaluates and writes summaries, weights and metrics to model_dir
+    is_chief = True
+    if params.dict.get('use_horovod'):
+        broadcast_op = hvd.broadcast_global_variables(0)
+        is_chief = hvd.rank() == 0
+
+    with tf.Session(config=config) as sess:
         # Initialize model variables
         sess.run(train_model_spec['variable_init_op'])
 
@@ -91,9 +101,15 @@ def train_and_evaluate(train_model_spec, eval_model_spec, model_dir, params, res
                 begin_at_epoch = int(restore_from.split('-')[-1])
             last_saver.restore(sess, restore_from)
 
+        if params.dict.get('use_horovod'):
+            sess.run(broadcast_op)
+
         # For tensorboard (takes care of writing summaries to files)
-        train_writer = tf.summary.FileWriter(os.path.join(model_dir, 'train_summaries'), sess.graph)
-        eval_writer = tf.summary.FileWriter(os.path.join(model_dir, 'eval_summaries'), sess.graph)
+        train_writer = None
+        eval_writer = None
+        if is_chief:
+            train_writer = tf.summary.FileWriter(os.path.join(model_dir, 'train_summaries'), sess.graph)
+            eval_writer = tf.summary.FileWriter(os.path.join(model_dir, 'eval_summaries'), sess.graph)
 
         best_eval_F2 = 0.0
         for epoch in range(begin_at_epoch, begin_at_epoch + params.num_epochs):
@@ -103,6 +119,10 @@ def train_and_evaluate(train_model_spec, eval_model_spec, model_dir, params, res
             num_steps = (params.train_size + params.batch_size - 1) // params.batch_size
             train_sess(sess, train_model_spec, num_steps, train_writer, params)
 
+            # Only worker 0 saves the weights and evaluates, the other workers go on training
+            if not is_chief:
+                continue
+
             # Save weights
             last_save_path = os.path.join(model_dir, 'last_weights', 'after-epoch')
             last_saver.save(sess, last_save_path, global_step=epoch + 1)
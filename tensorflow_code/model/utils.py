@@ -1,10 +1,18 @@
 """General utility functions"""
 
+import hashlib
 import json
 import logging
+import os
 from sklearn.metrics import fbeta_score
 import numpy as np
 
+try:
+    # Optional, only needed for data parallel training (`params.use_horovod`)
+    import horovod.tensorflow as hvd
+except ImportError:
+    hvd = None
+
 
 
 
@@ -80,6 +88,41 @@ def save_dict_to_json(d, json_path):
         d = {k: float(v) for k, v in d.items()}
         json.dump(d, f, indent=4)
 
+def get_cache_path(cache_dir, name, filenames, labels):
+    """Returns the file prefix where the decoded images of a dataset are cached.
+
+    The prefix is keyed on the filenames and labels, so that a different dataset (other
+    data_dir, changed csv, ...) never reads the images cached for another one. The caches
+    of other datasets and the incomplete ones (a run interrupted during its first epoch
+    leaves a lockfile behind) are deleted.
+
+    Args:
+        cache_dir: (string) directory containing the cache files
+        name: (string) name of the cache, unique for every process sharing `cache_dir`
+        filenames: (list) filenames of the images
+        labels: (np.array) corresponding labels
+    """
+    # Several workers may create the directory at the same time
+    os.makedirs(cache_dir, exist_ok=True)
+
+    key = hashlib.md5()
+    key.update('\n'.join(filenames).encode('utf-8'))
+    key.update(np.ascontiguousarray(labels).tobytes())
+    cache_prefix = '{}_{}'.format(name, key.hexdigest())
+    cache_path = os.path.join(cache_dir, cache_prefix)
+
+    # tf.data only writes the index file once the whole dataset has been cached
+    cache_complete = os.path.isfile(cache_path + '.index')
+    for entry in os.listdir(cache_dir):
+        if not entry.startswith(name + '_'):
+            continue
+        if cache_complete and entry.startswith(cache_prefix):
+            continue
+        os.remove(os.path.join(cache_dir, entry))
+
+    return cache_path
+
+
 def f2_score(labels, predictions):
     # fbeta_score throws a confusing error if inputs are not numpy arrays
     labels, predictions, = np.array(labels), np.array(predictions)
@@ -0,0 +1,90 @@
+"""Export the trained model to an INT8 quantized TFLite model for inference"""
+
+import argparse
+import logging
+import os
+import pandas as pd
+
+import numpy as np
+from PIL import Image
+import tensorflow as tf
+
+from model.model_fn import build_model
+from model.utils import Params
+from model.utils import set_logger
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--model_dir', default='experiments/best_model',
+                    help="Experiment directory containing params.json")
+parser.add_argument('--data_dir', default='data/64x64_Amazon_Rainforest_Dataset',
+                    help="Directory containing the dataset")
+parser.add_argument('--restore_from', default='best_weights',
+                    help="Subdirectory of model dir or file containing the weights")
+parser.add_argument('--num_calibration_images', default=500, type=int,
+                    help="Number of dev images used to calibrate the quantization ranges")
+
+
+def load_calibration_images(filenames, size):
+    """Load the images used to calibrate the quantization of the activations.
+
+    The images are preprocessed like in `input_fn` (floats in [0, 1], resized to `size`).
+
+    Args:
+        filenames: (list) filenames of the images
+        size: (int) size of the images fed to the model
+    """
+    for filename in filenames:
+        image = Image.open(filename).convert('RGB').resize((size, size), Image.BILINEAR)
+        image = np.asarray(image, dtype=np.float32) / 255.0
+        yield [image[np.newaxis]]
+
+
+if __name__ == '__main__':
+    # Load the parameters
+    args = parser.parse_args()
+    json_path = os.path.join(args.model_dir, 'params.json')
+    assert os.path.isfile(json_path), "No json configuration file found at {}".format(json_path)
+    params = Params(json_path)
+
+    # Set the logger
+    set_logger(os.path.join(args.model_dir, 'quantize.log'))
+
+    # Get the filenames of the dev set images used for calibration
+    data_dir = args.data_dir
+    dev_data_dir = os.path.join(data_dir, "dev_Amazon_Rainforest")
+    dev_filenames_labels = pd.read_csv(os.path.join(data_dir, 'dev_Amazon_Rainforest.csv'))
+    dev_filenames = (dev_data_dir + os.sep + dev_filenames_labels['image_name'] + ".jpg").tolist()
+    calibration_filenames = dev_filenames[:args.num_calibration_images]
+
+    # Define the inference model, fed by a placeholder instead of the tf.data pipeline
+    logging.info("Creating the model...")
+    images = tf.placeholder(tf.float32, [None, params.image_size, params.image_size, 3], name='images')
+    with tf.variable_scope('model'):
+        logits = build_model(False, {'images': images}, params)
+        probabilities = tf.nn.sigmoid(logits, name='probabilities')
+
+    saver = tf.train.Saver()
+
+    with tf.Session() as sess:
+        # Reload weights from the weights subdirectory
+        save_path = os.path.join(args.model_dir, args.restore_from)
+        if os.path.isdir(save_path):
+            save_path = tf.train.latest_checkpoint(save_path)
+        logging.info("Restoring parameters from {}".format(save_path))
+        saver.restore(sess, save_path)
+
+        # Quantize weights and activations to INT8, the ranges of the activations are
+        # calibrated on a few dev images. Inputs and outputs stay in float32.
+        logging.info("Quantizing the model with {} calibration images".format(len(calibration_filenames)))
+        converter = tf.lite.TFLiteConverter.from_session(sess, [images], [probabilities])
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = tf.lite.RepresentativeDataset(
+            lambda: load_calibration_images(calibration_filenames, params.image_size))
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        tflite_model = converter.convert()
+
+    save_path = os.path.join(args.model_dir, "model_int8.tflite")
+    with open(save_path, 'wb') as f:
+        f.write(tflite_model)
+    logging.info("Saved the quantized model in {}".format(save_path))
@@ -1,9 +1,14 @@
 """Aggregates results from the metrics_eval_best_weights.json in a parent folder."""
 
 import argparse
-import json
 import os
 
+try:
+    # orjson is a faster drop-in for parsing, fall back to the standard library if missing
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
 from tabulate import tabulate
 import pandas as pd
 
@@ -26,33 +31,29 @@ def aggregate_metrics(parent_dir, metrics):
     # Get the metrics for the folder if it has results from an experiment
     metrics_file = os.path.join(parent_dir, 'metrics_eval_best_weights.json')
     if os.path.isfile(metrics_file):
-        with open(metrics_file, 'r') as f:
-            metrics[parent_dir] = json.load(f)
+        with open(metrics_file, 'rb') as f:
+            metrics[parent_dir] = json_loads(f.read())
 
-    # Check every subdirectory of parent_dir
-    for subdir in os.listdir(parent_dir):
-        if not os.path.isdir(os.path.join(parent_dir, subdir)):
-            continue
-        else:
-            aggregate_metrics(os.path.join(parent_dir, subdir), metrics)
+    # Check every subdirectory of parent_dir (skipping hidden ones)
+    # scandir gets the file type from the directory listing, avoiding a stat per entry
+    with os.scandir(parent_dir) as entries:
+        for entry in entries:
+            if entry.name.startswith('.') or not entry.is_dir(follow_symlinks=False):
+                continue
+            aggregate_metrics(entry.path, metrics)
 
 
 def metrics_to_table(metrics):
     # Calculate the F2 score and create the metrics table.
-
-    for metric in list(metrics.keys()):
-        precision = metrics[metric]["precision"]
-        recall = metrics[metric]["recall"]
-        F2_metric = 5*precision*recall/(4*precision + recall)
-        metrics[metric]["F2"] = F2_metric
-
-    headers = metrics[list(metrics.keys())[0]].keys()
-    table = [[subdir] + [values[h] for h in headers] for subdir, values in metrics.items()]
-    res = tabulate(table, headers, tablefmt='pipe')
-    latex_headers = ["Experiment"]+list(headers)
-    latex_headers = [r"\textbf{" + header + "}" for header in latex_headers]
-    df = pd.DataFrame.from_records(table, columns=latex_headers).round(3)
-    print(df.to_latex(bold_rows=True, column_format= '| l | l | c | c | c | c | c |', escape=False))
+    # One row per experiment, one column per metric
+    df = pd.DataFrame.from_dict(metrics, orient='index')
+    df['F2'] = 5*df['precision']*df['recall']/(4*df['precision'] + df['recall'])
+
+    res = tabulate(df, headers='keys', tablefmt='pipe')
+    latex_df = df.round(3).reset_index()
+    latex_headers = ["Experiment"] + list(df.columns)
+    latex_df.columns = [r"\textbf{" + header + "}" for header in latex_headers]
+    print(latex_df.to_latex(bold_rows=True, column_format= '| l | l | c | c | c | c | c |', escape=False))
     return res
 
 
@@ -12,7 +12,10 @@ from model.input_fn import input_fn
 from model.utils import Params
 from model.utils import set_logger
 from model.utils import save_dict_to_json
+from model.utils import get_cache_path
+from model.utils import hvd
 from model.model_fn import model_fn
+from model.resnet import default_data_format
 from model.training import train_and_evaluate
 
 
@@ -35,6 +38,14 @@ if __name__ == '__main__':
     assert os.path.isfile(json_path), "No json configuration file found at {}".format(json_path)
     params = Params(json_path)
 
+    # Data parallel training with one process per GPU (launch with horovodrun / mpirun)
+    # Gradients are averaged with a NCCL ring all-reduce, so the learning rate is scaled
+    # with the number of workers
+    if params.dict.get('use_horovod'):
+        assert hvd is not None, "horovod is required to train with use_horovod"
+        hvd.init()
+        params.learning_rate *= hvd.size()
+
     # Check that we are not overwriting some previous experiment
     # Comment these lines if you are developing your model and don't care about overwritting
     model_dir_has_best_weights = os.path.isdir(os.path.join(args.model_dir, "best_weights"))
@@ -52,39 +63,62 @@ if __name__ == '__main__':
 
     # Get the filenames and labels from the train and dev sets
     train_filenames_labels = pd.read_csv(os.path.join(data_dir, 'train_Amazon_Rainforest.csv'))
-    train_filenames = [os.path.join(train_data_dir, f) + ".jpg" for f in train_filenames_labels.image_name.tolist()]
+    train_filenames = (train_data_dir + os.sep + train_filenames_labels['image_name'] + ".jpg").tolist()
 
     eval_filenames_labels = pd.read_csv(os.path.join(data_dir, 'dev_Amazon_Rainforest.csv'))
-    eval_filenames = [os.path.join(dev_data_dir, f) + ".jpg" for f in eval_filenames_labels.image_name.tolist()]
+    eval_filenames = (dev_data_dir + os.sep + eval_filenames_labels['image_name'] + ".jpg").tolist()
 
     # Build list with unique labels
-    label_list = [[],[]]
+    label_sets = [set(), set()]
     for i, tags in enumerate([train_filenames_labels.tags.values, eval_filenames_labels.tags.values]):
         for tag_str in tags:
-            labels = tag_str.split(' ')
-            for label in labels:
-                if label not in label_list[i]:
-                    label_list[i].append(label)
-    assert(len(label_list[0]) == len(label_list[1]))
-
-    # # Add onehot features for every label
-    for label in label_list[0]:
-        train_filenames_labels[label] = train_filenames_labels['tags'].apply(lambda x: 1 if label in x.split(' ') else 0)
-        eval_filenames_labels[label] = eval_filenames_labels['tags'].apply(lambda x: 1 if label in x.split(' ') else 0)
-
-    # Convert the labels to a matrix
-    # Labels will be  0 or 1 for each category
-    train_labels = train_filenames_labels.drop(["image_name", 'tags'], axis=1).as_matrix()
-    eval_labels = eval_filenames_labels.drop(["image_name", 'tags'], axis=1).as_matrix()
+            label_sets[i].update(tag_str.split(' '))
+    assert(label_sets[0] == label_sets[1])
+    # Sort the labels so that the label columns have the same order in train.py and evaluate.py
+    label_list = [sorted(s) for s in label_sets]
+
+    # Convert the labels to a matrix of onehot features for every label
+    # Labels will be  0 or 1 for each category, with the columns ordered as label_list[0]
+    train_labels = (train_filenames_labels['tags'].str.get_dummies(sep=' ')
+                    .reindex(columns=label_list[0], fill_value=0).to_numpy())
+    eval_labels = (eval_filenames_labels['tags'].str.get_dummies(sep=' ')
+                   .reindex(columns=label_list[0], fill_value=0).to_numpy())
 
     # Specify the sizes of the dataset we train on and evaluate on
     params.train_size = len(train_filenames)
+    if params.dict.get('use_horovod'):
+        # Every worker trains on its own shard, all of them run the same number of steps
+        params.train_size //= hvd.size()
     params.eval_size = len(eval_filenames)
 
+    # Cache the decoded training images in model_dir/cache (one cache per worker with horovod)
+    cache_dir = os.path.join(args.model_dir, 'cache')
+    if params.dict.get('use_horovod'):
+        cache_name = 'train-rank{}-of-{}'.format(hvd.rank(), hvd.size())
+    else:
+        cache_name = 'train'
+    train_cache_path = get_cache_path(cache_dir, cache_name, train_filenames, train_labels)
+
     # Create the two iterators over the two datasets
-    train_inputs = input_fn(True, train_filenames, train_labels, params)
+    train_inputs = input_fn(True, train_filenames, train_labels, params, cache_path=train_cache_path)
     eval_inputs = input_fn(False, eval_filenames, eval_labels, params)
 
+    # Turn on XLA JIT compilation so that the elementwise ops around the convolutions
+    # (batch norm, relu, residual add) get fused instead of round-tripping through memory
+    config = tf.ConfigProto()
+    config.graph_options.optimizer_options.global_jit_level = tf.OptimizerOptions.ON_1
+    if params.dict.get('use_horovod'):
+        # Pin one GPU per process
+        config.gpu_options.visible_device_list = str(hvd.local_rank())
+
+    # Pick the resnet data format for the devices of the session if it isn't set
+    # With horovod every process has its own GPU, so no device needs to be probed
+    if params.dict.get('data_format') is None:
+        if params.dict.get('use_horovod'):
+            params.data_format = 'channels_first'
+        else:
+            params.data_format = default_data_format(config)
+
     # Define the model
     logging.info("Creating the model...")
     train_model_spec = model_fn('train', train_inputs, params)
@@ -92,4 +126,5 @@ if __name__ == '__main__':
 
     # Train the model
     logging.info("Starting training for {} epoch(s)".format(params.num_epochs))
-    train_and_evaluate(train_model_spec, eval_model_spec, args.model_dir, params, args.restore_from)
+    train_and_evaluate(train_model_spec, eval_model_spec, args.model_dir, params, args.restore_from,
+                       config=config)